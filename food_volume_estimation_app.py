@@ -5,7 +5,12 @@ import os
 import json
 import logging
 import base64
-from flask import Flask, request, jsonify, make_response
+import orjson
+import hashlib
+import threading
+from collections import OrderedDict
+from flask import Flask, request, make_response
+from werkzeug.exceptions import RequestEntityTooLarge
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -15,17 +20,90 @@ app = Flask(__name__)
 estimator = None
 density_db = None
 
+# Largest accepted request body. Werkzeug stops reading bodies sent
+# without a Content-Length header at this size, and check_content_length()
+# turns a body that reaches it into a 413
+MAX_CONTENT_LENGTH = int(os.environ.get('MAX_CONTENT_LENGTH', 16 * 1024 * 1024))
+app.config['MAX_CONTENT_LENGTH'] = MAX_CONTENT_LENGTH
+
+# /predict_batch limits on the number of items and on the decoded pixels
+# held at once while the batch is assembled
+MAX_BATCH_ITEMS = int(os.environ.get('MAX_BATCH_ITEMS', 16))
+MAX_BATCH_BYTES = int(os.environ.get('MAX_BATCH_BYTES', 64 * 1024 * 1024))
+
+# cv2.imdecode() flags by (color, downscale); reduced modes let libjpeg
+# scale down while decoding instead of producing full-size pixels
+IMREAD_FLAGS = {
+    (True, 1): cv2.IMREAD_COLOR,
+    (True, 2): cv2.IMREAD_REDUCED_COLOR_2,
+    (True, 4): cv2.IMREAD_REDUCED_COLOR_4,
+    (True, 8): cv2.IMREAD_REDUCED_COLOR_8,
+    (False, 1): cv2.IMREAD_GRAYSCALE,
+    (False, 2): cv2.IMREAD_REDUCED_GRAYSCALE_2,
+    (False, 4): cv2.IMREAD_REDUCED_GRAYSCALE_4,
+    (False, 8): cv2.IMREAD_REDUCED_GRAYSCALE_8,
+}
+
+# Leading bytes of the encoded formats cv2.imdecode() can decode, depending
+# on the OpenCV build: PNG, JPEG, BMP, WebP, TIFF, PNM/PAM/PFM, JPEG 2000
+# (codestream and JP2), Sun raster, OpenEXR, Radiance HDR and GIF. AVIF
+# and other ISO base media files are matched by their 'ftyp' box instead
+IMAGE_SIGNATURES = (
+    b'\x89PNG', b'\xff\xd8\xff', b'BM', b'RIFF', b'II*\x00', b'MM\x00*',
+    b'P1', b'P2', b'P3', b'P4', b'P5', b'P6', b'P7', b'Pf', b'PF',
+    b'\xff\x4f\xff\x51', b'\x00\x00\x00\x0cjP  \r\n\x87\n',
+    b'\x59\xa6\x6a\x95', b'\x76\x2f\x31\x01', b'#?RADIANCE', b'#?RGBE',
+    b'GIF8')
+
+# Decoded images keyed by (decode flags, payload digest), most recently
+# used last. Bounded by entry count and by total decoded bytes, since a
+# small compressed payload can decode to hundreds of MB; images larger
+# than the per-entry limit are never cached
+DECODE_CACHE_SIZE = 128
+DECODE_CACHE_BYTES = int(os.environ.get('DECODE_CACHE_BYTES', 64 * 1024 * 1024))
+DECODE_CACHE_ENTRY_BYTES = int(os.environ.get('DECODE_CACHE_ENTRY_BYTES', 32 * 1024 * 1024))
+_decode_cache = OrderedDict()
+_decode_cache_nbytes = 0
+_decode_cache_lock = threading.Lock()
+
 # Simplified dummy classes for testing
 class DummyVolumeEstimator:
     def __init__(self):
         self.loaded = True
+        # Fraction of the base volume assigned to each dummy segment
+        self._scales = np.array([0.5, 0.3], dtype=np.float64)
     
     def estimate_volume(self, img, fov=70, plate_diameter_prior=0):
+        """Estimates the volumes of the food segments in an image.
+
+        Inputs:
+            img: Decoded image.
+            fov: Camera field of view.
+            plate_diameter_prior: Expected plate diameter, 0 to ignore.
+        Outputs:
+            volumes: (K,) array of per-segment volumes in cubic meters.
+        """
         # Return dummy volume data based on image size
         height, width = img.shape[:2]
         # Simulate volume estimation based on image area
         base_volume = (width * height) / 1000000  # Convert pixels to cubic meters
-        return [base_volume * 0.5, base_volume * 0.3]  # dummy volumes
+        return self._scales * base_volume  # dummy volumes
+
+    def estimate_volume_batch(self, imgs, fov=70, plate_diameter_priors=None):
+        """Estimates the volumes of a batch of images.
+
+        Inputs:
+            imgs: List of N images, shapes may differ.
+            fov: Camera field of view.
+            plate_diameter_priors: Expected plate diameter per image.
+        Outputs:
+            volumes: (N, K) array of per-segment volumes in cubic meters.
+        """
+        # Same image-area estimate as estimate_volume(), evaluated over
+        # the whole batch at once
+        sizes = np.array([img.shape[:2] for img in imgs], dtype=np.float64)
+        base_volumes = sizes.prod(axis=1) / 1000000
+        return np.outer(base_volumes, self._scales)
 
 class DummyDensityDatabase:
     def __init__(self, source):
@@ -38,13 +116,190 @@ class DummyDensityDatabase:
             'salad': ('salad', 0.3),
             'default': ('unknown', 0.8)
         }
+        # Keys are stored case-folded so query() needs a single lookup
+        self.data = {k.lower(): v for k, v in self.data.items()}
+        self._default = self.data['default']
+        # (food_type, entry) of the last query, swapped atomically
+        self._last = (None, None)
     
     def query(self, food_type):
-        return self.data.get(food_type.lower(), self.data['default'])
+        last_key, last_entry = self._last
+        if food_type == last_key:
+            return last_entry
+        entry = self.data.get(food_type.lower(), self._default)
+        self._last = (food_type, entry)
+        return entry
+
+def json_response(obj, status=200):
+    """Serializes obj with orjson into a JSON response.
+
+    NumPy arrays and scalars are serialized natively, so results do
+    not need converting to Python lists first.
+    """
+    return make_response(
+        orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY), status,
+        {'Content-Type': 'application/json'})
+
+def has_image_signature(np_img):
+    """Checks whether an encoded image buffer starts with the signature
+    of a format cv2.imdecode() may decode, without running the decoder.
+    Buffers that pass can still fail to decode, e.g. when truncated or
+    when the OpenCV build lacks the codec."""
+    header = np_img[:12].tobytes()
+    return header.startswith(IMAGE_SIGNATURES) or header[4:8] == b'ftyp'
+
+def imread_flags(color, downscale):
+    """Maps the color and downscale request fields to cv2.imdecode() flags.
+
+    Inputs:
+        color: Decode in color (True) or grayscale (False), must be a bool.
+        downscale: Resolution divisor, must be an int in 1, 2, 4 or 8.
+    Outputs:
+        flags: cv2.imdecode() flags, None if a field is invalid.
+        error: Error message if a field is invalid, None otherwise.
+    """
+    if not isinstance(color, bool):
+        return None, 'Invalid color, expected true or false'
+    # bool is an int subclass, and 2.0 would match the int 2 key
+    if (not isinstance(downscale, int) or isinstance(downscale, bool)
+            or (color, downscale) not in IMREAD_FLAGS):
+        return None, 'Invalid downscale factor, expected 1, 2, 4 or 8'
+    return IMREAD_FLAGS[(color, downscale)], None
+
+def decode_image(np_img, flags=cv2.IMREAD_COLOR, use_cache=True):
+    """Decodes an encoded image buffer into a BGR or grayscale array.
+
+    Identical payloads are decoded once and served from an LRU cache
+    keyed by a digest of the encoded bytes. Cached arrays are marked
+    read-only since they are shared between requests. The cache holds
+    at most DECODE_CACHE_BYTES of decoded pixels, and images above
+    DECODE_CACHE_ENTRY_BYTES are returned without being cached.
+
+    Inputs:
+        np_img: Encoded image (PNG/JPEG/...) as a uint8 array.
+        flags: cv2.imdecode() flags, see IMREAD_FLAGS.
+        use_cache: Look up and store the decoded image in the cache.
+    Outputs:
+        img: Decoded image, or None if decoding failed.
+    """
+    if not use_cache:
+        # np.frombuffer() aliases the request payload, so the decoded pixel
+        # array is the only image-sized allocation on this path
+        return cv2.imdecode(np_img, flags)
+
+    key = (flags, hashlib.blake2b(np_img, digest_size=16).digest())
+    with _decode_cache_lock:
+        img = _decode_cache.get(key)
+        if img is not None:
+            _decode_cache.move_to_end(key)
+            return img
+
+    # Decoded arrays are not drawn from a reusable per-thread buffer: they
+    # outlive the request in the cache, and neither cv2.imdecode() nor
+    # Pillow's Python bindings can decode into caller-owned memory
+    img = cv2.imdecode(np_img, flags)
+    if img is None:
+        return None
+    img.setflags(write=False)
+    if img.nbytes > DECODE_CACHE_ENTRY_BYTES:
+        return img
+
+    global _decode_cache_nbytes
+    with _decode_cache_lock:
+        if key not in _decode_cache:
+            _decode_cache[key] = img
+            _decode_cache_nbytes += img.nbytes
+        while (len(_decode_cache) > DECODE_CACHE_SIZE
+               or _decode_cache_nbytes > DECODE_CACHE_BYTES):
+            _, evicted = _decode_cache.popitem(last=False)
+            _decode_cache_nbytes -= evicted.nbytes
+    return img
+
+def parse_item(content, use_cache=True):
+    """Decodes the image and reads the parameters of a request item.
+
+    Inputs:
+        content: Parsed JSON object with img, food_type,
+            plate_diameter, color and downscale fields.
+        use_cache: Use the decoded image cache.
+    Outputs:
+        img: Decoded BGR, or grayscale if color is false, image.
+        food_type: The type of food to estimate.
+        plate_diameter: The expected plate diameter, 0 to ignore.
+        error: Error message if the item is invalid, None otherwise.
+    """
+    if 'img' not in content:
+        return None, None, None, 'Missing img field in request'
+
+    # Decode to fewer channels or pixels when the caller allows it
+    flags, error = imread_flags(content.get('color', True),
+                                content.get('downscale', 1))
+    if error is not None:
+        return None, None, None, error
+
+    img_encoded = content['img']
+    if isinstance(img_encoded, str):
+        # Assume base64 encoded
+        try:
+            img_data = base64.b64decode(img_encoded)
+            np_img = np.frombuffer(img_data, np.uint8)
+        except Exception:
+            return None, None, None, 'Invalid base64 image data'
+    else:
+        # Assume byte array
+        try:
+            if isinstance(img_encoded, (bytes, bytearray)):
+                np_img = np.frombuffer(img_encoded, np.uint8)
+            else:
+                np_img = np.asarray(img_encoded, dtype=np.uint8)
+            # Scalars and nested lists are not encoded byte sequences
+            if np_img.ndim != 1:
+                return None, None, None, 'Invalid byte array image data'
+        except Exception:
+            return None, None, None, 'Invalid byte array image data'
+
+    # Reject non-image payloads before invoking the decoder
+    if not has_image_signature(np_img):
+        return None, None, None, 'Unsupported image format'
+
+    img = decode_image(np_img, flags, use_cache)
+    if img is None:
+        return None, None, None, 'Could not decode image'
+
+    # Get food type
+    food_type = content.get('food_type', 'default')
+
+    # Get expected plate diameter from form data or set to 0 and ignore
+    try:
+        plate_diameter = float(content.get('plate_diameter', 0))
+    except (ValueError, TypeError):
+        plate_diameter = 0
+
+    return img, food_type, plate_diameter, None
+
+def configure_opencv(default_threads=1):
+    """Keeps OpenCV on its SIMD paths, sizes its thread pool to the
+    container rather than the host, and skips OpenCL probing.
+
+    The thread count is the outermost level of OMP_NUM_THREADS (e.g. 4
+    for "4,2"), or default_threads if it is unset or malformed.
+    """
+    num_threads = os.environ.get('OMP_NUM_THREADS', '')
+    try:
+        num_threads = int(num_threads.split(',')[0])
+    except ValueError:
+        if num_threads:
+            logger.warning("Ignoring malformed OMP_NUM_THREADS=%r", num_threads)
+        num_threads = default_threads
+
+    cv2.setUseOptimized(True)
+    cv2.setNumThreads(num_threads)
+    cv2.ocl.setUseOpenCL(False)
 
 def load_volume_estimator(depth_model_architecture, depth_model_weights,
         segmentation_model_weights, density_db_source):
     """Loads volume estimator object and sets up its parameters."""
+    configure_opencv()
     try:
         global estimator, density_db
         
@@ -56,15 +311,62 @@ def load_volume_estimator(depth_model_architecture, depth_model_weights,
         return True
         
     except Exception as e:
-        logger.error(f"Error loading volume estimator: {str(e)}")
+        logger.exception("Error loading volume estimator: %s", e)
         return False
 
+def estimate_response(img, food_type, plate_diameter):
+    """Estimates the volumes and weight of the food in a decoded image
+    and returns them as a JSON response."""
+    # Estimate volumes
+    img_shape = img.shape
+    try:
+        volumes = estimator.estimate_volume(img, fov=70, plate_diameter_prior=plate_diameter)
+        # Convert to mL
+        volumes_ml = volumes * 1e6
+        
+        # Convert volumes to weight - assuming a single food type
+        db_entry = density_db.query(food_type)
+        density = db_entry[1]
+        weight = float(volumes_ml.sum() * density)
+
+        # Return values
+        return_vals = {
+            'food_type_match': db_entry[0],
+            'weight_grams': round(weight, 2),
+            'volumes_ml': np.round(volumes_ml, 2),
+            'density_g_per_ml': density,
+            'status': 'success',
+            'image_shape': img_shape
+        }
+        return json_response(return_vals)
+        
+    except Exception as e:
+        logger.exception("Error estimating volume: %s", e)
+        return json_response({'error': 'Volume estimation failed', 'details': str(e)}, 500)
+
+@app.before_request
+def check_content_length():
+    """Rejects oversized requests before the routes parse their body."""
+    if request.content_length and request.content_length > MAX_CONTENT_LENGTH:
+        return json_response({'error': 'Payload too large'}, 413)
+    if request.content_length is None and request.method == 'POST':
+        # Chunked bodies are cut at MAX_CONTENT_LENGTH while being read,
+        # so read (and cache for the routes) now and treat reaching the
+        # cap as too large rather than passing on a truncated body
+        if len(request.get_data(cache=True)) >= MAX_CONTENT_LENGTH:
+            return json_response({'error': 'Payload too large'}, 413)
+
+@app.errorhandler(RequestEntityTooLarge)
+def payload_too_large(e):
+    """Returns Werkzeug's own size limit errors as JSON."""
+    return json_response({'error': 'Payload too large'}, 413)
+
 @app.route('/', methods=['GET'])
 def health_check():
     """Health check endpoint for Cloud Run."""
     if estimator is None:
-        return make_response(jsonify({'status': 'unhealthy', 'reason': 'models not loaded'}), 503)
-    return make_response(jsonify({'status': 'healthy', 'message': 'Food Volume Estimation API is running'}), 200)
+        return json_response({'status': 'unhealthy', 'reason': 'models not loaded'}, 503)
+    return json_response({'status': 'healthy', 'message': 'Food Volume Estimation API is running'}, 200)
 
 @app.route('/predict', methods=['POST'])
 def volume_estimation():
@@ -75,110 +377,220 @@ def volume_estimation():
         img: The image data as base64 string
         food_type: The type of food to estimate
         plate_diameter: The expected plate diameter (optional)
+        color: Decode in color, false for grayscale (optional)
+        downscale: Decode at 1/2, 1/4 or 1/8 resolution (optional)
+
+    Sending a "Cache-Control: no-cache" header bypasses the decoded
+    image cache.
 
     Returns:
         The estimated weight in JSON format.
     """
     if estimator is None:
-        return make_response(jsonify({'error': 'Models not loaded'}), 503)
+        return json_response({'error': 'Models not loaded'}, 503)
         
     # Decode incoming data to get an image
     try:
-        content = request.get_json()
-        if not content:
-            return make_response(jsonify({'error': 'No JSON data provided'}), 400)
-            
-        if 'img' in content:
-            img_encoded = content['img']
-            if isinstance(img_encoded, str):
-                # Assume base64 encoded
-                try:
-                    img_data = base64.b64decode(img_encoded)
-                    np_img = np.frombuffer(img_data, np.uint8)
-                except Exception:
-                    return make_response(jsonify({'error': 'Invalid base64 image data'}), 400)
-            else:
-                # Assume byte array
-                try:
-                    img_byte_string = ' '.join([str(x) for x in img_encoded])
-                    np_img = np.fromstring(img_byte_string, np.int8, sep=' ')
-                except Exception:
-                    return make_response(jsonify({'error': 'Invalid byte array image data'}), 400)
-            
-            img = cv2.imdecode(np_img, cv2.IMREAD_COLOR)
-            if img is None:
-                return make_response(jsonify({'error': 'Could not decode image'}), 400)
-        else:
-            return make_response(jsonify({'error': 'Missing img field in request'}), 400)
+        # Parse once without raising; malformed or non-JSON bodies give None
+        content = request.get_json(silent=True, cache=True)
+        if not isinstance(content, dict):
+            return json_response({'error': 'No JSON data provided'}, 400)
+
+        use_cache = 'no-cache' not in request.headers.get('Cache-Control', '')
+        img, food_type, plate_diameter, error = parse_item(content, use_cache)
+        if error is not None:
+            return json_response({'error': error}, 400)
             
     except Exception as e:
-        logger.error(f"Error decoding image: {str(e)}")
-        return make_response(jsonify({'error': 'Image decoding failed'}), 400)
+        logger.exception("Error decoding image: %s", e)
+        return json_response({'error': 'Image decoding failed'}, 400)
 
-    # Get food type
-    food_type = content.get('food_type', 'default')
+    return estimate_response(img, food_type, plate_diameter)
 
-    # Get expected plate diameter from form data or set to 0 and ignore
+@app.route('/predict_raw', methods=['POST'])
+def raw_volume_estimation():
+    """Receives the encoded image as the raw HTTP request body and
+    returns the estimated volumes of the foods in it. Skips the JSON
+    parse and base64 decode of /predict.
+
+    Query parameters:
+        food_type: The type of food to estimate
+        plate_diameter: The expected plate diameter (optional)
+        color: Decode in color, false for grayscale (optional)
+        downscale: Decode at 1/2, 1/4 or 1/8 resolution (optional)
+
+    Returns:
+        The estimated weight in JSON format.
+    """
+    if estimator is None:
+        return json_response({'error': 'Models not loaded'}, 503)
+
+    # Decode request body to get an image
     try:
-        plate_diameter = float(content.get('plate_diameter', 0))
-    except (ValueError, TypeError):
-        plate_diameter = 0
+        # Already cached by check_content_length() for chunked bodies
+        img_data = request.get_data(cache=False)
+        if not img_data:
+            return json_response({'error': 'No image data provided'}, 400)
 
-    # Estimate volumes
+        # Query string values are text; map them to the JSON field types
+        color = {'true': True, 'false': False}.get(
+            request.args.get('color', 'true').lower())
+        downscale = request.args.get('downscale', '1')
+        # ASCII digits only: isdigit() alone also accepts e.g. superscripts
+        # that int() rejects
+        downscale = (int(downscale) if downscale.isascii() and downscale.isdigit()
+                     else None)
+        flags, error = imread_flags(color, downscale)
+        if error is not None:
+            return json_response({'error': error}, 400)
+
+        np_img = np.frombuffer(img_data, np.uint8)
+        if not has_image_signature(np_img):
+            return json_response({'error': 'Unsupported image format'}, 400)
+
+        use_cache = 'no-cache' not in request.headers.get('Cache-Control', '')
+        img = decode_image(np_img, flags, use_cache)
+        if img is None:
+            return json_response({'error': 'Could not decode image'}, 400)
+
+    except Exception as e:
+        logger.exception("Error decoding image: %s", e)
+        return json_response({'error': 'Image decoding failed'}, 400)
+
+    food_type = request.args.get('food_type', 'default')
+    # Set to 0 and ignore if missing or malformed
+    plate_diameter = request.args.get('plate_diameter', 0, type=float)
+
+    return estimate_response(img, food_type, plate_diameter)
+
+
+@app.route('/predict_batch', methods=['POST'])
+def batch_volume_estimation():
+    """Receives a batch of images in a single HTTP request and
+    returns the estimated volumes of the foods in each.
+
+    JSON payload:
+        items: List of at most MAX_BATCH_ITEMS objects with the
+            /predict payload fields (img, food_type, plate_diameter,
+            color, downscale)
+
+    Batches whose decoded images exceed MAX_BATCH_BYTES in total are
+    rejected.
+
+    Returns:
+        The estimated weights in JSON format, one result per item
+        in request order.
+    """
+    if estimator is None:
+        return json_response({'error': 'Models not loaded'}, 503)
+
+    # Decode incoming data to get the images
     try:
-        volumes = estimator.estimate_volume(img, fov=70, plate_diameter_prior=plate_diameter)
-        # Convert to mL
-        volumes_ml = [v * 1e6 for v in volumes]
-        
-        # Convert volumes to weight - assuming a single food type
-        db_entry = density_db.query(food_type)
-        density = db_entry[1]
-        weight = sum(v * density for v in volumes_ml)
+        content = request.get_json(silent=True, cache=True)
+        items = content.get('items') if isinstance(content, dict) else None
+        if not isinstance(items, list) or not items:
+            return json_response({'error': 'Missing items list in request'}, 400)
+        if len(items) > MAX_BATCH_ITEMS:
+            return json_response(
+                {'error': 'Too many items, at most {}'.format(MAX_BATCH_ITEMS)}, 413)
+
+        use_cache = 'no-cache' not in request.headers.get('Cache-Control', '')
+        imgs, food_types, plate_diameters = [], [], []
+        batch_nbytes = 0
+        for i, item in enumerate(items):
+            if not isinstance(item, dict):
+                return json_response({'error': 'Invalid item', 'index': i}, 400)
+            img, food_type, plate_diameter, error = parse_item(item, use_cache)
+            if error is not None:
+                return json_response({'error': error, 'index': i}, 400)
+            batch_nbytes += img.nbytes
+            if batch_nbytes > MAX_BATCH_BYTES:
+                return json_response(
+                    {'error': 'Decoded batch too large', 'index': i}, 413)
+            imgs.append(img)
+            food_types.append(food_type)
+            plate_diameters.append(plate_diameter)
+
+    except Exception as e:
+        logger.exception("Error decoding image: %s", e)
+        return json_response({'error': 'Image decoding failed'}, 400)
+
+    # Estimate volumes for the whole batch
+    try:
+        volumes = estimator.estimate_volume_batch(
+            imgs, fov=70, plate_diameter_priors=plate_diameters)
+        # Convert to mL, (N, K)
+        volumes_ml = volumes * 1e6
+
+        # Convert volumes to weights
+        db_entries = [density_db.query(food_type) for food_type in food_types]
+        densities = np.array([db_entry[1] for db_entry in db_entries])
+        weights = (volumes_ml * densities[:, None]).sum(axis=1)
 
         # Return values
-        return_vals = {
+        weights = np.round(weights, 2)
+        volumes_ml = np.round(volumes_ml, 2)
+        results = [{
             'food_type_match': db_entry[0],
-            'weight_grams': round(weight, 2),
-            'volumes_ml': [round(v, 2) for v in volumes_ml],
-            'density_g_per_ml': density,
-            'status': 'success',
+            'weight_grams': weight,
+            'volumes_ml': item_volumes_ml,
+            'density_g_per_ml': db_entry[1],
             'image_shape': img.shape
-        }
-        return make_response(jsonify(return_vals), 200)
-        
+        } for db_entry, weight, item_volumes_ml, img
+            in zip(db_entries, weights, volumes_ml, imgs)]
+        return json_response({'results': results, 'status': 'success'})
+
     except Exception as e:
-        logger.error(f"Error estimating volume: {str(e)}")
-        return make_response(jsonify({'error': 'Volume estimation failed', 'details': str(e)}), 500)
+        logger.exception("Error estimating volume: %s", e)
+        return json_response({'error': 'Volume estimation failed', 'details': str(e)}, 500)
+
+
+def create_app(depth_model_architecture=None, depth_model_weights=None,
+        segmentation_model_weights=None, density_db_source=None):
+    """Loads the volume estimator and returns the Flask app.
+
+    Used as the WSGI entry point, e.g.
+    gunicorn -c gunicorn_conf.py "food_volume_estimation_app:create_app()".
+    Paths not given are read from the environment. With preload_app the
+    estimator is loaded once in the master and shared by the workers.
+    """
+    logger.info("Starting Food Volume Estimation API...")
+    success = load_volume_estimator(
+        depth_model_architecture or os.environ.get(
+            'DEPTH_MODEL_ARCHITECTURE', 'models/architecture.json'),
+        depth_model_weights or os.environ.get(
+            'DEPTH_MODEL_WEIGHTS', 'models/depth_weights.h5'),
+        segmentation_model_weights or os.environ.get(
+            'SEGMENTATION_MODEL_WEIGHTS', 'models/segmentation_weights.h5'),
+        density_db_source or os.environ.get(
+            'DENSITY_DB_SOURCE', 'models/density_db.xlsx')
+    )
+    
+    if not success:
+        logger.warning("Models could not be loaded. API will run in limited mode.")
+    return app
 
 
 if __name__ == '__main__':
+    # Development server, see gunicorn_conf.py for production
     parser = argparse.ArgumentParser(description='Food volume estimation API.')
     parser.add_argument('--depth_model_architecture', type=str,
-                        help='Path to depth model architecture (.json).',
-                        default=os.environ.get('DEPTH_MODEL_ARCHITECTURE', 'models/architecture.json'))
+                        help='Path to depth model architecture (.json).')
     parser.add_argument('--depth_model_weights', type=str,
-                        help='Path to depth model weights (.h5).',
-                        default=os.environ.get('DEPTH_MODEL_WEIGHTS', 'models/depth_weights.h5'))
+                        help='Path to depth model weights (.h5).')
     parser.add_argument('--segmentation_model_weights', type=str,
-                        help='Path to segmentation model weights (.h5).',
-                        default=os.environ.get('SEGMENTATION_MODEL_WEIGHTS', 'models/segmentation_weights.h5'))
+                        help='Path to segmentation model weights (.h5).')
     parser.add_argument('--density_db_source', type=str,
-                        help='Path to food density database (.xlsx) or Google Sheets ID.',
-                        default=os.environ.get('DENSITY_DB_SOURCE', 'models/density_db.xlsx'))
+                        help='Path to food density database (.xlsx) or Google Sheets ID.')
     args = parser.parse_args()
 
-    logger.info("Starting Food Volume Estimation API...")
-    success = load_volume_estimator(
+    create_app(
         args.depth_model_architecture,
         args.depth_model_weights, 
         args.segmentation_model_weights,
         args.density_db_source
     )
     
-    if not success:
-        logger.warning("Models could not be loaded. API will run in limited mode.")
-    
     port = int(os.environ.get("PORT", 8080))
-    logger.info(f"Starting server on port {port}")
+    logger.info("Starting server on port %d", port)
     app.run(host='0.0.0.0', port=port, debug=False)
-
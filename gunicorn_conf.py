@@ -0,0 +1,18 @@
+"""Gunicorn configuration for the Food Volume Estimation API."""
+import os
+
+bind = '0.0.0.0:{}'.format(os.environ.get('PORT', 8080))
+
+# Load the estimator once in the master and fork workers from it, so the
+# model state is shared copy-on-write instead of loaded per worker
+preload_app = True
+
+# Sized for a 1-2 vCPU Cloud Run instance rather than the host's CPU count:
+# each worker has its own decode cache and OpenCV thread pool, so
+# concurrency comes from threads within a single worker by default
+workers = int(os.environ.get('WEB_CONCURRENCY', 1))
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', 8))
+
+# Cloud Run enforces its own request timeout
+timeout = 0
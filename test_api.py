@@ -4,30 +4,34 @@ Test script for the Food Volume Estimation API
 """
 
 import requests
+from requests.adapters import HTTPAdapter
 import base64
+import functools
 import json
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from io import BytesIO
 from PIL import Image
 import numpy as np
 
+@functools.lru_cache(maxsize=None)
 def create_test_image(width=100, height=100, color=(255, 0, 0)):
-    """Create a simple test image"""
+    """Create a simple test image, encoded once per (width, height, color)"""
     # Create a simple colored rectangle
     img = Image.new('RGB', (width, height), color)
     
     # Convert to base64
     buffer = BytesIO()
-    img.save(buffer, format='PNG')
+    img.save(buffer, format='JPEG', quality=85)
     img_str = base64.b64encode(buffer.getvalue()).decode()
     
     return img_str
 
-def test_health_check(base_url):
+def test_health_check(session, base_url):
     """Test the health check endpoint"""
     print("🏥 Testing health check...")
     try:
-        response = requests.get(f"{base_url}/")
+        response = session.get(f"{base_url}/")
         print(f"   Status: {response.status_code}")
         print(f"   Response: {response.json()}")
         return response.status_code == 200
@@ -35,9 +39,13 @@ def test_health_check(base_url):
         print(f"   ❌ Error: {e}")
         return False
 
-def test_prediction(base_url, food_type="apple", img_width=200, img_height=150):
-    """Test the prediction endpoint"""
-    print(f"🍎 Testing prediction for {food_type}...")
+def test_prediction(session, base_url, food_type="apple", img_width=200, img_height=150):
+    """Test the prediction endpoint
+    
+    Output is collected and returned rather than printed, so that tests
+    running concurrently do not interleave their lines.
+    """
+    lines = [f"🍎 Testing prediction for {food_type}..."]
     
     # Create test image
     test_img = create_test_image(img_width, img_height)
@@ -49,20 +57,83 @@ def test_prediction(base_url, food_type="apple", img_width=200, img_height=150):
     }
     
     try:
-        response = requests.post(
+        response = session.post(
             f"{base_url}/predict",
             json=payload,
             headers={"Content-Type": "application/json"}
         )
+        lines.append(f"   Status: {response.status_code}")
+        
+        if response.status_code == 200:
+            result = response.json()
+            lines.append(f"   Food type: {result['food_type_match']}")
+            lines.append(f"   Weight: {result['weight_grams']} grams")
+            lines.append(f"   Volumes: {result['volumes_ml']} ml")
+            lines.append(f"   Density: {result['density_g_per_ml']} g/ml")
+            lines.append(f"   Image shape: {result['image_shape']}")
+            return True, lines
+        else:
+            lines.append(f"   ❌ Error: {response.text}")
+            return False, lines
+            
+    except Exception as e:
+        lines.append(f"   ❌ Error: {e}")
+        return False, lines
+
+def test_batch_prediction(session, base_url, food_types, img_width=200, img_height=150):
+    """Test the batch prediction endpoint"""
+    print(f"📦 Testing batch prediction for {len(food_types)} items...")
+    
+    # Create test image
+    test_img = create_test_image(img_width, img_height)
+    
+    payload = {
+        "items": [
+            {"img": test_img, "food_type": food_type, "plate_diameter": 24.0}
+            for food_type in food_types
+        ]
+    }
+    
+    try:
+        response = session.post(
+            f"{base_url}/predict_batch",
+            json=payload,
+            headers={"Content-Type": "application/json"}
+        )
+        print(f"   Status: {response.status_code}")
+        
+        if response.status_code == 200:
+            results = response.json()['results']
+            for result in results:
+                print(f"   {result['food_type_match']}: {result['weight_grams']} grams")
+            return len(results) == len(food_types)
+        else:
+            print(f"   ❌ Error: {response.text}")
+            return False
+            
+    except Exception as e:
+        print(f"   ❌ Error: {e}")
+        return False
+
+def test_raw_prediction(session, base_url, food_type="apple", img_width=200, img_height=150):
+    """Test the raw image body prediction endpoint"""
+    print(f"📷 Testing raw prediction for {food_type}...")
+    
+    # Create test image
+    test_img = base64.b64decode(create_test_image(img_width, img_height))
+    
+    try:
+        response = session.post(
+            f"{base_url}/predict_raw",
+            params={"food_type": food_type, "plate_diameter": 24.0},
+            data=test_img,
+            headers={"Content-Type": "application/octet-stream"}
+        )
         print(f"   Status: {response.status_code}")
         
         if response.status_code == 200:
             result = response.json()
-            print(f"   Food type: {result['food_type_match']}")
             print(f"   Weight: {result['weight_grams']} grams")
-            print(f"   Volumes: {result['volumes_ml']} ml")
-            print(f"   Density: {result['density_g_per_ml']} g/ml")
-            print(f"   Image shape: {result['image_shape']}")
             return True
         else:
             print(f"   ❌ Error: {response.text}")
@@ -72,26 +143,36 @@ def test_prediction(base_url, food_type="apple", img_width=200, img_height=150):
         print(f"   ❌ Error: {e}")
         return False
 
-def test_invalid_requests(base_url):
+def test_invalid_requests(session, base_url):
     """Test error handling"""
     print("🚫 Testing error handling...")
     
     # Test empty request
     try:
-        response = requests.post(f"{base_url}/predict", json={})
+        response = session.post(f"{base_url}/predict", json={})
         print(f"   Empty request - Status: {response.status_code}")
     except Exception as e:
         print(f"   ❌ Error testing empty request: {e}")
     
     # Test invalid image
     try:
-        response = requests.post(
+        response = session.post(
             f"{base_url}/predict",
             json={"img": "invalid_base64", "food_type": "apple"}
         )
         print(f"   Invalid image - Status: {response.status_code}")
     except Exception as e:
         print(f"   ❌ Error testing invalid image: {e}")
+    
+    # Test valid base64 that is not an image
+    try:
+        response = session.post(
+            f"{base_url}/predict",
+            json={"img": base64.b64encode(b"not an image").decode(), "food_type": "apple"}
+        )
+        print(f"   Non-image data - Status: {response.status_code}")
+    except Exception as e:
+        print(f"   ❌ Error testing non-image data: {e}")
 
 def main():
     """Main test function"""
@@ -102,6 +183,13 @@ def main():
     
     base_url = sys.argv[1].rstrip('/')
     
+    # Reuse keep-alive connections across tests instead of opening a new
+    # TCP/TLS connection per request
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=8)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    
     print("🧪 Food Volume Estimation API Test Suite")
     print("=" * 50)
     print(f"Testing API at: {base_url}")
@@ -113,7 +201,7 @@ def main():
     
     # Health check
     total_tests += 1
-    if test_health_check(base_url):
+    if test_health_check(session, base_url):
         tests_passed += 1
         print("   ✅ Health check passed")
     else:
@@ -123,17 +211,42 @@ def main():
     # Test different food types
     food_types = ["apple", "banana", "rice", "chicken", "pasta", "salad", "unknown"]
     
-    for food_type in food_types:
-        total_tests += 1
-        if test_prediction(base_url, food_type):
-            tests_passed += 1
+    # Requests are independent and I/O-bound, so overlap them
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        results = list(executor.map(
+            lambda food_type: test_prediction(session, base_url, food_type),
+            food_types))
+    
+    for food_type, (passed, lines) in zip(food_types, results):
+        print("\n".join(lines))
+        if passed:
             print(f"   ✅ {food_type} prediction passed")
         else:
             print(f"   ❌ {food_type} prediction failed")
         print()
+    total_tests += len(results)
+    tests_passed += sum(passed for passed, _ in results)
+    
+    # Test all food types in a single batch
+    total_tests += 1
+    if test_batch_prediction(session, base_url, food_types):
+        tests_passed += 1
+        print("   ✅ Batch prediction passed")
+    else:
+        print("   ❌ Batch prediction failed")
+    print()
+    
+    # Test raw image body
+    total_tests += 1
+    if test_raw_prediction(session, base_url):
+        tests_passed += 1
+        print("   ✅ Raw prediction passed")
+    else:
+        print("   ❌ Raw prediction failed")
+    print()
     
     # Test error handling
-    test_invalid_requests(base_url)
+    test_invalid_requests(session, base_url)
     print()
     
     # Results